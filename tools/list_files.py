@@ -1,13 +1,20 @@
+import os
+import sys
 import click
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
-def recursive_list_files(directory: Path):
-    for file in directory.iterdir():
-        if file.is_dir():
-            yield from recursive_list_files(file)
-        else:
-            yield file
+def recursive_list_files(directory):
+    """Iteratively walk directory with os.scandir, yielding non-directory DirEntry objects."""
+    stack = [os.fspath(directory)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                # DirEntry caches d_type, so this check does not need a stat()
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry
 
 
 @click.group()
@@ -18,41 +25,54 @@ def cli():
 @click.argument('dirs', type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True), nargs=-1, required=True)
 def list_files(dirs):
     """List all files in directories."""
+    # Write encoded names straight to the binary stdout in ~64 KiB batches
+    # instead of paying click.echo's per-line encoding and flush handling
+    write = sys.stdout.buffer.write
+    encoding, errors = sys.getfilesystemencoding(), sys.getfilesystemencodeerrors()
+    buf = bytearray()
     for directory in dirs:
-        directory = Path(directory)
-        for file in recursive_list_files(directory):
-            relative_path = file.relative_to(directory) 
-            click.echo(relative_path.as_posix().replace('/', '_'))
+        # Length of the root prefix to slice off each path; join() adds the
+        # trailing separator unless the root already ends with one (e.g. '/')
+        root_len = len(os.path.join(directory, ''))
+        for entry in recursive_list_files(directory):
+            buf += entry.path[root_len:].replace(os.sep, '_').encode(encoding, errors)
+            buf += b'\n'
+            if len(buf) >= 65536:
+                write(buf)
+                buf.clear()
+    write(buf)
+    sys.stdout.buffer.flush()
 
 @cli.command()
 @click.argument('src_dir', nargs=1, type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True), required=True)
 @click.argument('link_dir', nargs=1, type=click.Path(file_okay=False, dir_okay=True, resolve_path=True), required=True)
-def create_symlinks(src_dir, link_dir):
+@click.option('--jobs', default=32, type=click.IntRange(min=1), help='Number of symlinks to create in parallel (default: 32)')
+def create_symlinks(src_dir, link_dir, jobs):
     """
     Recursively explore files in source_dir and create symbolic links in target_dir
     with unique file names based on relative paths.
     """
-    src_path = Path(src_dir)
-    link_path = Path(link_dir)
-
     # Ensure the target directory exists
-    link_path.mkdir(parents=True, exist_ok=True)
-
-    for file in recursive_list_files(src_path):
-        # Calculate the relative path from source directory and create a unique name
-        relative_path = file.relative_to(src_path)
-        unique_name = relative_path.as_posix().replace('/', '_')
-
-        # Create the symlink path in the target directory
-        symlink_path = link_path / unique_name
-
-        try:
-            # Create a symbolic link
-            symlink_path.symlink_to(file)
-        except FileExistsError:
-            click.echo(f"Skipped (already exists): {symlink_path}", err=True)
-        except Exception as e:
-            click.echo(f"Error creating symlink {symlink_path}: {e}", err=True)
+    os.makedirs(link_dir, exist_ok=True)
+
+    # Calculate the relative path from source directory and create a unique name
+    links = []
+    root_len = len(os.path.join(src_dir, ''))
+    for entry in recursive_list_files(src_dir):
+        unique_name = entry.path[root_len:].replace(os.sep, '_')
+        links.append((entry.path, os.path.join(link_dir, unique_name)))
+
+    # symlink() is I/O bound and releases the GIL, so issue the calls from a
+    # thread pool to hide per-call latency on network filesystems
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(os.symlink, src, symlink_path): symlink_path for src, symlink_path in links}
+        for future in as_completed(futures):
+            symlink_path = futures[future]
+            e = future.exception()
+            if isinstance(e, FileExistsError):
+                click.echo(f"Skipped (already exists): {symlink_path}", err=True)
+            elif e is not None:
+                click.echo(f"Error creating symlink {symlink_path}: {e}", err=True)
 
 
 def main():
@@ -1,29 +1,210 @@
 import os
 import json
+import math
+import mmap
+import struct
+import asyncio
+import sqlite3
+import hashlib
+import zlib
+import aiohttp
+import blake3
+from array import array
+from itertools import accumulate, compress
 import click
-from pathlib import Path
-from dify_client.client import KnowledgeBaseClient
 
 
-def fetch_dataset_id(client, dataset_name, page_size=100):
-    """Fetch the ID of a dataset by its name, considering pagination."""
-    page = 1
-    while True:
-        response = client.list_datasets(page=page, page_size=page_size)
-        if response.status_code == 200:
-            datasets = response.json().get('data', [])
-            for dataset in datasets:
-                if dataset.get("name") == dataset_name:
-                    return dataset.get("id")
-            if len(datasets) < page_size:
-                break
-            page += 1
-        else:
+DATASET_ID_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'rag-playground', 'dataset_ids.json')
+
+# No overall limit, so large uploads over a slow link are not cut off after aiohttp's default 5 minutes
+CLIENT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30)
+
+
+def load_dataset_id_cache(cache_file=DATASET_ID_CACHE_FILE):
+    """Load the cached mapping of API key, base URL and dataset name to dataset ID."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_dataset_id_cache(cache, cache_file=DATASET_ID_CACHE_FILE):
+    """Atomically write the dataset ID cache to disk."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
+def dataset_id_cache_key(client, dataset_name):
+    """Return the key of a dataset in the ID caches; the API key is hashed so it is not stored in the cache file."""
+    api_key_hash = hashlib.sha256(client.api_key.encode('utf-8')).hexdigest()[:16]
+    return f"{api_key_hash}\t{client.base_url}\t{dataset_name}"
+
+
+class DatasetNotFoundError(Exception):
+    """Raised when a dataset-scoped endpoint reports that the dataset does not exist."""
+
+
+class ApiResponse:
+    """The status code and body of a finished API request."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class KnowledgeBaseClient:
+    """An aiohttp-based client for the Dify knowledge base API.
+
+    Mirrors the methods of dify_client's KnowledgeBaseClient that this tool
+    uses, but as coroutines sharing one ClientSession, so many requests can be
+    in flight at once on a single thread.
+    """
+
+    def __init__(self, session, api_key, base_url='https://api.dify.ai/v1', dataset_id=None):
+        self.session = session
+        self.api_key = api_key
+        self.base_url = base_url
+        self.dataset_id = dataset_id
+
+    def _get_dataset_id(self):
+        if self.dataset_id is None:
+            raise ValueError("dataset_id is not set")
+        return self.dataset_id
+
+    async def _send_request(self, method, endpoint, **kwargs):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with self.session.request(method, f"{self.base_url}{endpoint}", headers=headers, **kwargs) as response:
+            return ApiResponse(response.status, await response.text())
+
+    async def list_datasets(self, page=1, page_size=20, params=None):
+        return await self._send_request(
+            "GET", "/datasets", params={'page': page, 'limit': page_size, **(params or {})})
+
+    async def list_documents(self, page=None, page_size=None, keyword=None):
+        params = {}
+        if page is not None:
+            params['page'] = page
+        if page_size is not None:
+            params['limit'] = page_size
+        if keyword:
+            params['keyword'] = keyword
+        return await self._send_request("GET", f"/datasets/{self._get_dataset_id()}/documents", params=params)
+
+    async def create_document_by_file(self, file_path, original_document_id=None, extra_params=None):
+        data = {'process_rule': {'mode': 'automatic'}, 'indexing_technique': 'high_quality'}
+        if extra_params is not None and isinstance(extra_params, dict):
+            data.update(extra_params)
+        if original_document_id is not None:
+            data['original_document_id'] = original_document_id
+        # The API takes one file per request and has no bulk endpoint; the
+        # session's keep-alive connections avoid a new handshake per file
+        with open(file_path, 'rb') as f:
+            form = aiohttp.FormData()
+            form.add_field('data', json.dumps(data))
+            form.add_field('file', f, filename=os.path.basename(file_path))
+            return await self._send_request(
+                "POST", f"/datasets/{self._get_dataset_id()}/document/create_by_file", data=form)
+
+async def lookup_dataset_id(client, dataset_name, page_size=100, max_concurrency=8):
+    """Look up the ID of a dataset by its name on the server, considering pagination.
+
+    The first page tells how many datasets match; the remaining pages are then
+    requested concurrently rather than one round-trip after another.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_page(page):
+        # Let the server narrow the listing down by name. Servers that do not
+        # support the keyword filter ignore it, so the exact name match below
+        # and the pagination still give the right answer.
+        async with semaphore:
+            response = await client.list_datasets(page=page, page_size=page_size, params={'keyword': dataset_name})
+        if response.status_code != 200:
             raise Exception(f"Failed to retrieve datasets. Status code: {
                             response.status_code}")
+        return response.json()
+
+    def find(datasets):
+        for dataset in datasets:
+            if dataset.get("name") == dataset_name:
+                return dataset.get("id")
+        return None
+
+    body = await fetch_page(1)
+    # Use the limit the server reports, in case the server caps the requested page size
+    limit = body.get('limit') or page_size
+    datasets = body.get('data', [])
+    dataset_id = find(datasets)
+    if dataset_id or len(datasets) < limit:
+        return dataset_id
+
+    total = body.get('total')
+    if total is None:
+        # Without a total count, keep paging until a short page
+        page = 1
+        while len(datasets) >= limit:
+            page += 1
+            datasets = (await fetch_page(page)).get('data', [])
+            dataset_id = find(datasets)
+            if dataset_id:
+                return dataset_id
+        return None
+
+    num_pages = math.ceil(total / limit)
+    tasks = [asyncio.create_task(fetch_page(page)) for page in range(2, num_pages + 1)]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            dataset_id = find((await next_page).get('data', []))
+            if dataset_id:
+                return dataset_id
+    finally:
+        # Drop the pages that are still in flight
+        for task in tasks:
+            task.cancel()
     return None
 
 
+# Dataset IDs already found in this process, keyed like the cache file by dataset_id_cache_key
+_dataset_ids = {}
+
+
+async def fetch_dataset_id(client, dataset_name, page_size=100, refresh=False):
+    """Fetch the ID of a dataset by its name, consulting the in-process and local caches first unless refresh is set."""
+    cache_key = dataset_id_cache_key(client, dataset_name)
+    if not refresh and cache_key in _dataset_ids:
+        return _dataset_ids[cache_key]
+
+    cache = load_dataset_id_cache()
+    if not refresh and cache_key in cache:
+        _dataset_ids[cache_key] = cache[cache_key]
+        return cache[cache_key]
+
+    dataset_id = await lookup_dataset_id(client, dataset_name, page_size=page_size)
+    if dataset_id:
+        _dataset_ids[cache_key] = dataset_id
+    else:
+        _dataset_ids.pop(cache_key, None)
+    if cache.get(cache_key) != dataset_id:
+        # Store the new ID, or drop a stale one when the dataset is gone
+        if dataset_id:
+            cache[cache_key] = dataset_id
+        else:
+            del cache[cache_key]
+        try:
+            save_dataset_id_cache(cache)
+        except OSError as e:
+            click.echo(f"Failed to save dataset ID cache: {e}", err=True)
+    return dataset_id
+
+
 @click.group()
 @click.option('--api-key', required=True, help='Dify API key', envvar='DIFY_API_KEY')
 @click.option('--base-url', default='http://rag-playground-nginx-1/v1', help='Dify base URL', envvar='DIFY_BASE_URL')
@@ -37,136 +218,690 @@ def cli(ctx, api_key, base_url):
 
 @cli.command()
 @click.option('--dataset-name', default='proceedings', help='Name of the dataset to look up')
+@click.option('--refresh', is_flag=True, help='Look the dataset up on the server even if its ID is cached, and update the cache')
 @click.pass_context
-def get_dataset_id(ctx, dataset_name):
+def get_dataset_id(ctx, dataset_name, refresh):
     """Look up and print the ID of a dataset by its name."""
-    try:
+    async def run():
         api_key = ctx.obj['API_KEY']
         base_url = ctx.obj['BASE_URL']
 
-        client = KnowledgeBaseClient(api_key=api_key, base_url=base_url)
+        async with aiohttp.ClientSession(timeout=CLIENT_TIMEOUT) as session:
+            client = KnowledgeBaseClient(session, api_key=api_key, base_url=base_url)
 
-        dataset_id = fetch_dataset_id(client, dataset_name)
-        if dataset_id:
-            click.echo(f"{dataset_id}")
-        else:
-            click.echo(f"No dataset found with the name: {
-                       dataset_name}", err=True)
+            dataset_id = await fetch_dataset_id(client, dataset_name, refresh=refresh)
+            if dataset_id:
+                click.echo(f"{dataset_id}")
+            else:
+                click.echo(f"No dataset found with the name: {
+                           dataset_name}", err=True)
+
+    try:
+        asyncio.run(run())
     except Exception as e:
         click.echo(f"An error occurred: {e}", err=True)
 
 
-def load_uploaded_files(database_file):
-    """Load the set of already uploaded files from a database text file."""
+def iter_uploaded_files(database_file, block_size=1 << 24):
+    """Iterate over the file paths recorded in a database text file, as stripped UTF-8 bytes."""
     if not os.path.exists(database_file):
-        return set()
-    with open(database_file, 'r', encoding='utf-8') as db:
-        return set(line.strip() for line in db if line.strip())
+        return
+    with open(database_file, 'rb') as db:
+        tail = b''
+        # Split large blocks in C instead of reading line by line; the last
+        # piece of each block may be a partial line and is carried over
+        while block := db.read(block_size):
+            lines = (tail + block).split(b'\n')
+            tail = lines.pop()
+            yield from filter(None, map(bytes.strip, lines))
+        if tail := tail.strip():
+            yield tail
 
 
 def save_uploaded_files(db_file_handle, file_path):
-    """Save the uploaded file path to the open database file handle."""
-    db_file_handle.write(f"{file_path}\n")
+    """Save the uploaded file path to the open binary database file handle."""
+    db_file_handle.write(f"{file_path}\n".encode('utf-8'))
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter whose bit array lives in an mmap'd file.
+
+    Membership tests are O(1) and the filter costs about 34 bits per element
+    at the default error rate, instead of a Python string per element.
+    A false positive makes a new file look already uploaded, so the filter
+    is sized for a very low error rate by default.
+    """
+
+    MAGIC = b'RAGBLOOM'
+    HEADER = struct.Struct('<8sQQ')  # magic, number of bits, number of hashes
+
+    def __init__(self, path, capacity=1_000_000, error_rate=1e-7):
+        self.path = path
+        if not os.path.exists(path):
+            num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+            with open(path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, num_bits, num_hashes))
+                f.truncate(self.HEADER.size + (num_bits + 7) // 8)
+        self._file = open(path, 'r+b')
+        self._mmap = None
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+            magic, self.num_bits, self.num_hashes = self.HEADER.unpack_from(self._mmap)
+        except (ValueError, struct.error):
+            # An empty or truncated file, e.g. after a full disk
+            magic = None
+        if magic != self.MAGIC or len(self._mmap) != self.HEADER.size + (self.num_bits + 7) // 8:
+            self.close()
+            raise ValueError(f"Not a Bloom filter file: {path}")
+
+    def _positions(self, item):
+        # Kirsch-Mitzenmacher double hashing: derive all k bit positions from one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        offset = self.HEADER.size * 8
+        for i in range(self.num_hashes):
+            yield offset + (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, item):
+        bits = self._mmap
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        bits = self._mmap
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def close(self):
+        if self._mmap is not None and not self._mmap.closed:
+            self._mmap.flush()
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_uploaded_files_filter(database_file, capacity):
+    """Open the Bloom filter of uploaded files, seeding it from the database file on first use."""
+    bloom_file = f"{database_file}.bloom"
+    if os.path.exists(bloom_file):
+        try:
+            return BloomFilter(bloom_file)
+        except ValueError as e:
+            click.echo(f"{e}; rebuilding it from the database file", err=True)
+    # Seed into a temporary file so an interrupted run does not leave a partial filter behind
+    tmp_file = f"{bloom_file}.{os.getpid()}.tmp"
+    with BloomFilter(tmp_file, capacity=capacity) as bloom:
+        for file_path in iter_uploaded_files(database_file):
+            bloom.add(file_path.decode('utf-8'))
+    os.replace(tmp_file, bloom_file)
+    return BloomFilter(bloom_file)
+
+
+class UploadedFilesIndex:
+    """Exact membership test over the paths in a database text file.
+
+    Instead of a set of Python strings, the file is mmap'd and indexed by an
+    open-addressing hash table of line offsets, kept in <database_file>.index;
+    a lookup hashes the path and byte-compares it with the line at each probed
+    offset. The index records how much of the database file it covers, with
+    the file's inode and a CRC of the covered bytes, so a run only indexes the
+    lines appended since the index was last updated, and a rewritten file is
+    indexed from scratch. The index is opened on the first lookup, so runs
+    that never need an exact answer do not touch it at all.
+    """
+
+    MAGIC = b'RAGINDEX'
+    # magic, number of slots, number of entries, indexed bytes of the database file, its inode, CRC-32 of the indexed bytes
+    HEADER = struct.Struct('<8sQQQQQ')
+
+    def __init__(self, database_file):
+        self.database_file = database_file
+        self.index_file = f"{database_file}.index"
+        self._file = None
+        self._mmap = None
+        self._index_file = None
+        self._index = None
+        self._table = None
+        self._opened = False
+        # Paths recorded after the file was mapped
+        self._added = set()
+
+    # CRC-32 is stable across processes, so the persisted table stays valid, and a
+    # collision only costs one more byte comparison; binding it directly lets the
+    # hashes of a whole block be computed by map() in C
+    _hash = staticmethod(zlib.crc32)
 
+    def _crc(self, start, end, value=0):
+        with memoryview(self._mmap) as view:
+            return zlib.crc32(view[start:end], value)
 
-def recursive_list_files(paths: list, extensions: set):
-    """Recursively list files in the given paths (both files and directories) with specific extensions."""
+    def _line_at(self, offset):
+        end = self._mmap.find(b'\n', offset)
+        return self._mmap[offset:end if end >= 0 else len(self._mmap)].strip()
+
+    def _scan(self, start, block_size=1 << 24):
+        """Return the offsets and hashes of the non-empty lines after start, and the end of the last complete line."""
+        offsets = array('Q')
+        hashes = array('Q')
+        mm = self._mmap
+        # A trailing partial line may still be being written; index it next time
+        end = max(start, mm.rfind(b'\n', start) + 1)
+        offset = start
+        while offset < end:
+            # Blocks end at a newline, so no line is split between two of them
+            block_end = mm.rfind(b'\n', offset, min(offset + block_size, end)) + 1 or mm.find(b'\n', offset) + 1
+            lines = mm[offset:block_end].split(b'\n')
+            lines.pop()
+            keys = list(map(bytes.strip, lines))
+            # Offsets of the line starts, each line followed by its newline; _line_at strips
+            # the line again, so leading whitespace needs no adjustment
+            starts = accumulate((len(line) + 1 for line in lines), initial=offset)
+            # Keep the offsets of the non-empty lines only, like their hashes below
+            offsets.extend(compress(starts, keys))
+            hashes.extend(map(self._hash, filter(None, keys)))
+            offset = block_end
+        return offsets, hashes, end
+
+    @staticmethod
+    def _insert(table, offsets, hashes):
+        # Slots hold offset + 1 so that 0 marks an empty slot
+        mask = len(table) - 1
+        for offset, key_hash in zip(offsets, hashes):
+            slot = key_hash & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = offset + 1
+
+    def _open_index(self):
+        """Map the index file and return its header, or None if it is missing, damaged or does not match the database file."""
+        try:
+            self._index_file = open(self.index_file, 'r+b')
+        except FileNotFoundError:
+            return None
+        try:
+            self._index = mmap.mmap(self._index_file.fileno(), 0)
+            magic, num_slots, num_entries, indexed, inode, crc = self.HEADER.unpack_from(self._index)
+        except (ValueError, struct.error):
+            # An empty or truncated file, e.g. after a full disk
+            magic = None
+        if (magic != self.MAGIC or len(self._index) != self.HEADER.size + 8 * num_slots
+                or inode != os.fstat(self._file.fileno()).st_ino or indexed > len(self._mmap)
+                or self._crc(0, indexed) != crc):
+            self._close_index()
+            return None
+        self._table = memoryview(self._index)[self.HEADER.size:].cast('Q')
+        return num_slots, num_entries, indexed, crc
+
+    def _close_index(self):
+        if self._table is not None:
+            self._table.release()
+            self._table = None
+        if self._index is not None:
+            self._index.close()
+        if self._index_file is not None:
+            self._index_file.close()
+        self._index = self._index_file = None
+
+    def _build(self, offsets, hashes, indexed):
+        # Leave room for the table to double before it exceeds a load factor of 0.5
+        size = 1 << max(4, (4 * len(offsets)).bit_length())
+        table = array('Q', bytes(8 * size))
+        self._insert(table, offsets, hashes)
+        tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            inode = os.fstat(self._file.fileno()).st_ino
+            f.write(self.HEADER.pack(self.MAGIC, size, len(offsets), indexed, inode, self._crc(0, indexed)))
+            table.tofile(f)
+        os.replace(tmp_file, self.index_file)
+        self._index_file = open(self.index_file, 'r+b')
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self._table = memoryview(self._index)[self.HEADER.size:].cast('Q')
+
+    def _open(self):
+        self._opened = True
+        if not os.path.exists(self.database_file) or os.path.getsize(self.database_file) == 0:
+            return
+        self._file = open(self.database_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = self._open_index()
+        if header is None:
+            self._build(*self._scan(0))
+            return
+        num_slots, num_entries, indexed, crc = header
+        offsets, hashes, end = self._scan(indexed)
+        if not offsets:
+            return
+        if 2 * (num_entries + len(offsets)) > num_slots:
+            # Too full for the new lines; rebuild a larger index from the whole file
+            self._close_index()
+            self._build(*self._scan(0))
+            return
+        self._insert(self._table, offsets, hashes)
+        inode = os.fstat(self._file.fileno()).st_ino
+        self.HEADER.pack_into(self._index, 0, self.MAGIC, num_slots, num_entries + len(offsets), end,
+                              inode, self._crc(indexed, end, crc))
+
+    def __contains__(self, file_path):
+        if file_path in self._added:
+            return True
+        if not self._opened:
+            self._open()
+        table = self._table
+        if not table:
+            return False
+        key = file_path.encode('utf-8')
+        mask = len(table) - 1
+        slot = self._hash(key) & mask
+        while table[slot]:
+            if self._line_at(table[slot] - 1) == key:
+                return True
+            slot = (slot + 1) & mask
+        return False
+
+    def add(self, file_path):
+        self._added.add(file_path)
+
+    def close(self):
+        self._close_index()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """Compute the BLAKE3 hex digest of a file's content, reading it in 1 MiB chunks."""
+    hasher = blake3.blake3()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class UploadedContentDatabase:
+    """SQLite database of uploaded content and of directories whose files are all uploaded.
+
+    The uploaded table maps the BLAKE3 hash of uploaded content to the path it
+    was uploaded from. The covered_dirs table records, per walk configuration
+    (the matched extensions and whether symlinks are followed), directories in
+    which every matching file was already uploaded, together with the
+    directory's mtime and its subdirectories, so that the walk can skip
+    listing them again while their mtime is unchanged.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS uploaded (hash TEXT PRIMARY KEY, path TEXT NOT NULL) WITHOUT ROWID')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS covered_dirs (path TEXT NOT NULL, extensions TEXT NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, subdirs TEXT NOT NULL, PRIMARY KEY (path, extensions)) WITHOUT ROWID')
+
+    def get(self, digest):
+        """Return the path the content was uploaded from, or None if it has not been uploaded."""
+        row = self._conn.execute('SELECT path FROM uploaded WHERE hash = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, digest, file_path):
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO uploaded (hash, path) VALUES (?, ?)', (digest, file_path))
+
+    def get_covered_dir(self, directory, walk_key, mtime_ns):
+        """Return the subdirectory names of a covered directory, or None if it is not covered at this mtime."""
+        row = self._conn.execute(
+            'SELECT mtime_ns, subdirs FROM covered_dirs WHERE path = ? AND extensions = ?',
+            (directory, walk_key)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1])
+
+    def add_covered_dir(self, directory, walk_key, mtime_ns, subdirs):
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO covered_dirs (path, extensions, mtime_ns, subdirs) VALUES (?, ?, ?, ?)',
+                (directory, walk_key, mtime_ns, json.dumps(subdirs, ensure_ascii=False)))
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def recursive_list_files(paths: list, extensions: tuple, is_uploaded=None, covered_dirs=None, follow_symlinks=False,
+                         on_skip=None, onerror=None, covered_scope=''):
+    """Recursively list resolved paths of files with the given lowercase extensions, skipping uploaded files and covered directories."""
+    # Directories in which every matching file is uploaded are recorded in covered_dirs per walk configuration
+    # and per covered_scope, which names the uploaded-files log the records were derived from
+    walk_key = f"{covered_scope}\t{','.join(extensions)}" + (';follow-symlinks' if follow_symlinks else '')
+    # Resolved directories already walked, so symlink cycles cannot make the walk loop
+    visited = set()
     for path in paths:
-        p = Path(path)
-        if p.is_dir():
-            for file in p.rglob('*'):
-                if file.is_file() and (file.suffix in extensions):
-                    yield file
-        elif p.is_file() and (p.suffix in extensions):
-            yield p
+        path = os.path.realpath(path)
+        if os.path.isdir(path):
+            stack = [path]
+            while stack:
+                directory = stack.pop()
+                if follow_symlinks:
+                    if directory in visited:
+                        continue
+                    visited.add(directory)
+
+                if covered_dirs is not None:
+                    # Take the mtime before listing, so entries added meanwhile invalidate the record
+                    try:
+                        mtime_ns = os.stat(directory).st_mtime_ns
+                    except OSError as e:
+                        if onerror is not None:
+                            onerror(e)
+                        continue
+                    # A covered directory is only stat'ed until its mtime changes; descend into its recorded subdirectories
+                    subdirs = covered_dirs.get_covered_dir(directory, walk_key, mtime_ns)
+                    if subdirs is not None:
+                        if on_skip is not None:
+                            on_skip(directory, True)
+                        stack.extend(os.path.join(directory, name) for name in subdirs)
+                        continue
+
+                # Subdirectory names, or resolved absolute paths for followed symlinks
+                subdirs = []
+                covered = is_uploaded is not None
+                # Hand unreadable directories to onerror and skip them instead of aborting the walk, as Path.rglob did
+                try:
+                    it = os.scandir(directory)
+                except OSError as e:
+                    if onerror is not None:
+                        onerror(e)
+                    continue
+                with it:
+                    for entry in it:
+                        # DirEntry answers is_dir/is_symlink/is_file(follow_symlinks=False) from
+                        # the cached d_type, so only symlinks cost a stat() here
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            stack.append(entry.path)
+                            continue
+                        if entry.is_symlink():
+                            if follow_symlinks and entry.is_dir():
+                                target = os.path.realpath(entry.path)
+                                subdirs.append(target)
+                                stack.append(target)
+                                continue
+                            # str.endswith accepts a tuple and matches in C, without building a Path to parse the suffix
+                            if not (entry.name.lower().endswith(extensions) and entry.is_file()):
+                                continue
+                            full_path = os.path.realpath(entry.path)
+                        elif entry.name.lower().endswith(extensions) and entry.is_file(follow_symlinks=False):
+                            full_path = entry.path
+                        else:
+                            continue
+
+                        if is_uploaded is not None and is_uploaded(full_path):
+                            if on_skip is not None:
+                                on_skip(full_path, False)
+                            continue
+                        covered = False
+                        yield full_path
+
+                if covered and covered_dirs is not None:
+                    covered_dirs.add_covered_dir(directory, walk_key, mtime_ns, subdirs)
+        elif os.path.isfile(path) and path.lower().endswith(extensions):
+            if is_uploaded is not None and is_uploaded(path):
+                if on_skip is not None:
+                    on_skip(path, False)
+                continue
+            yield path
+
 
 @cli.command()
 @click.argument('src', type=click.Path(exists=True, resolve_path=True), nargs=-1, required=True)
 @click.option('--dataset-name', default='proceedings', help='Name of the dataset to add the files to')
 @click.option('--extensions', default='txt,md,pdf', help='Comma-separated list of file extensions to include (default: txt, md, pdf)')
 @click.option('--database-file', default='uploaded_files.txt', type=click.Path(), help='Path to the text file that stores the list of uploaded files')
+@click.option('--hash-database-file', default=None, type=click.Path(), help='Path to the SQLite database that stores the content hashes of uploaded files and the directories whose files are all uploaded (default: the database file path with .sqlite3 appended)')
+@click.option('--expected-files', default=1_000_000, type=click.IntRange(min=1), help='Number of files the uploaded-files Bloom filter is sized for when it is first created (default: 1000000)')
+@click.option('--jobs', default=8, type=click.IntRange(min=1), help='Number of files to upload in parallel (default: 8)')
+@click.option('--follow-symlinks', is_flag=True, help='Descend into symlinked directories (each directory is visited once)')
 @click.pass_context
-def add(ctx, src, dataset_name, extensions, database_file):
+def add(ctx, src, dataset_name, extensions, database_file, hash_database_file, expected_files, jobs, follow_symlinks):
     """Add files from source paths (files or directories) to a specified dataset, skipping already uploaded files."""
-    try:
+    async def run():
         api_key = ctx.obj['API_KEY']
         base_url = ctx.obj['BASE_URL']
 
-        client = KnowledgeBaseClient(api_key=api_key, base_url=base_url)
+        async with aiohttp.ClientSession(timeout=CLIENT_TIMEOUT) as session:
+            client = KnowledgeBaseClient(session, api_key=api_key, base_url=base_url)
 
-        dataset_id = fetch_dataset_id(client, dataset_name)
-        if not dataset_id:
-            click.echo(f"No dataset found with the name: {dataset_name}", err=True)
-            return
-        client.dataset_id = dataset_id
+            dataset_id = await fetch_dataset_id(client, dataset_name)
+            if not dataset_id:
+                click.echo(f"No dataset found with the name: {dataset_name}", err=True)
+                return
+            client.dataset_id = dataset_id
 
-        # Load the set of uploaded files from the database
-        uploaded_files = load_uploaded_files(database_file)
+            # Open the Bloom filter of uploaded files; the database file itself is
+            # kept as an append-only log, and deleting the .bloom file rebuilds
+            # the filter from it on the next run
+            uploaded_files = open_uploaded_files_filter(database_file, expected_files)
 
-        # Convert the extensions to a set of suffixes with leading dots
-        extensions_set = {f".{ext.strip()}" for ext in extensions.split(",")}
+            # Confirm Bloom filter hits against the database file, so a false positive does not skip a new file;
+            # like the .bloom file, the .index file next to it is persisted and rebuilt when deleted
+            uploaded_index = UploadedFilesIndex(database_file)
 
-        # Open the database file for appending successfully uploaded files
-        with open(database_file, 'a', encoding='utf-8') as db_file_handle:
-            # Recursively find files in the source paths
-            for file in recursive_list_files(src, extensions_set):
-                full_path = str(file.resolve())
+            # Open the database of uploaded content so identical files under other names are not uploaded twice;
+            # it follows the database file by default, so uploading to another dataset with its own log starts afresh
+            uploaded_contents = UploadedContentDatabase(hash_database_file or f"{database_file}.sqlite3")
 
-                # Check if the file is already uploaded
-                if full_path in uploaded_files:
-                    click.echo(f"File already uploaded, skipping: {full_path}")
-                    continue
+            # Convert the extensions to a tuple of lowercase suffixes with leading dots,
+            # so that e.g. '.PDF' files match as well
+            extensions_tuple = tuple(f".{ext.strip().lower()}" for ext in extensions.split(","))
+
+            # Bounds the number of uploads in flight
+            in_flight = asyncio.Semaphore(jobs)
+            uploads = set()
+            # Paths of the content queued for upload in this run, by digest, so identical
+            # files are not uploaded concurrently; the first path is uploaded first
+            queued_contents = {}
+            # Number of paths written to the database file since it was last synced
+            unsynced = 0
 
-                # Upload the file
-                response = client.create_document_by_file(file_path=full_path)
-                if response.status_code == 200:
-                    # Update the database with the newly uploaded file
+            # Open the database file for appending successfully uploaded files, with a
+            # large write buffer that is flushed and synced in batches below
+            with (uploaded_files, uploaded_index, uploaded_contents,
+                  open(database_file, 'ab', buffering=65536) as db_file_handle):
+                def record_uploaded(full_path):
+                    nonlocal unsynced
                     save_uploaded_files(db_file_handle, full_path)
                     uploaded_files.add(full_path)
-                else:
-                    click.echo(f"Failed to add file '{full_path}'. Status code: {response.status_code}", err=True)
+                    uploaded_index.add(full_path)
+                    unsynced += 1
+                    if unsynced >= 32:
+                        db_file_handle.flush()
+                        os.fsync(db_file_handle.fileno())
+                        unsynced = 0
+
+                # Dataset IDs already looked up again after a 404
+                refreshed_ids = set()
+                refresh_lock = asyncio.Lock()
+
+                async def create_document(full_path):
+                    dataset_id = client.dataset_id
+                    response = await client.create_document_by_file(file_path=full_path)
+                    if response.status_code != 404:
+                        return response
+                    # The cached ID may belong to a dataset that was deleted and recreated;
+                    # look it up again once and retry with the new ID
+                    async with refresh_lock:
+                        if dataset_id not in refreshed_ids:
+                            refreshed_ids.add(dataset_id)
+                            new_id = await fetch_dataset_id(client, dataset_name, refresh=True)
+                            if new_id:
+                                client.dataset_id = new_id
+                    if client.dataset_id == dataset_id:
+                        return response
+                    return await client.create_document_by_file(file_path=full_path)
+
+                async def upload(digest):
+                    # Duplicates found while the upload is in flight are appended to paths;
+                    # if an upload fails, the same content is tried from the next path
+                    paths = queued_contents[digest]
+                    try:
+                        for i, full_path in enumerate(paths):
+                            try:
+                                response = await create_document(full_path)
+                            except Exception as e:
+                                click.echo(f"Failed to add file '{full_path}': {e}", err=True)
+                                continue
+                            if response.status_code == 200:
+                                # Update the databases with the newly uploaded file and its duplicates
+                                uploaded_contents.add(digest, full_path)
+                                for path in paths[i:]:
+                                    record_uploaded(path)
+                                return
+                            click.echo(f"Failed to add file '{full_path}'. Status code: {response.status_code}", err=True)
+                    finally:
+                        del queued_contents[digest]
+                        in_flight.release()
+
+                def is_uploaded(full_path):
+                    return full_path in uploaded_files and full_path in uploaded_index
+
+                def report_skip(path, is_dir):
+                    if is_dir:
+                        # Its subdirectories are still walked
+                        click.echo(f"Directory listing unchanged, skipping its files: {path}")
+                    else:
+                        click.echo(f"File already uploaded, skipping: {path}")
+
+                def report_error(e):
+                    click.echo(f"Failed to list directory, skipping: {e}", err=True)
+
+                try:
+                    # Recursively find files in the source paths that are not uploaded yet. The walk
+                    # (scandir, stat and the database and filter checks) runs on the event loop, so
+                    # uploads in flight stall while it lists files it skips between two yields
+                    for full_path in recursive_list_files(src, extensions_tuple, is_uploaded, uploaded_contents, follow_symlinks,
+                                                          report_skip, report_error, os.path.abspath(database_file)):
+                        # Check if the same content is already uploaded under another path;
+                        # hash in a worker thread so uploads keep progressing meanwhile
+                        try:
+                            digest = await asyncio.to_thread(hash_file, full_path)
+                        except OSError as e:
+                            click.echo(f"Failed to read file '{full_path}': {e}", err=True)
+                            continue
+                        # Trust the hash only while its path is still in the database file, so removing
+                        # lines from the log makes their content uploadable again
+                        uploaded_path = uploaded_contents.get(digest)
+                        if uploaded_path is not None and is_uploaded(uploaded_path):
+                            click.echo(f"Same content already uploaded as '{uploaded_path}', skipping: {full_path}")
+                            # Record the path so the next run skips it without hashing
+                            record_uploaded(full_path)
+                            continue
+                        if digest in queued_contents:
+                            click.echo(f"Same content already queued as '{queued_contents[digest][0]}', "
+                                       f"recording it with that upload: {full_path}")
+                            queued_contents[digest].append(full_path)
+                            continue
+                        queued_contents[digest] = [full_path]
+
+                        # Upload the file
+                        await in_flight.acquire()
+                        task = asyncio.create_task(upload(digest))
+                        uploads.add(task)
+                        task.add_done_callback(uploads.discard)
+                finally:
+                    # Let the uploads in flight finish before the databases are closed
+                    await asyncio.gather(*uploads)
+
+    try:
+        asyncio.run(run())
     except Exception as e:
         click.echo(f"An error occurred: {e}", err=True)
 
 
+async def iter_documents(client, keyword, page_size=100):
+    """Iterate over the documents in the client's dataset, prefetching the next page while the current one is consumed."""
+    page = 1
+    next_page = asyncio.create_task(client.list_documents(page=page, page_size=page_size, keyword=keyword))
+    try:
+        while True:
+            response = await next_page
+            if response.status_code == 404:
+                raise DatasetNotFoundError(f"Dataset not found: {client.dataset_id}")
+            if response.status_code != 200:
+                raise Exception(f"Failed to retrieve documents. Status code: {
+                                response.status_code}")
+
+            body = response.json()
+            has_more = body.get("has_more", False)
+            if has_more:
+                # Request the next page before handing out this one
+                page += 1
+                next_page = asyncio.create_task(
+                    client.list_documents(page=page, page_size=page_size, keyword=keyword))
+
+            for doc in body.get('data', []):
+                yield doc
+
+            if not has_more:
+                break
+    finally:
+        next_page.cancel()
+
+
 @cli.command()
 @click.option('--dataset-name', required=True, help='Name of the dataset to search in')
 @click.option('--keyword', default='', help='Keyword to search for in the documents')
 @click.pass_context
 def search(ctx, dataset_name, keyword):
     """Search for documents in a specified dataset using an optional keyword."""
-    try:
+    async def run():
         api_key = ctx.obj['API_KEY']
         base_url = ctx.obj['BASE_URL']
 
-        client = KnowledgeBaseClient(api_key=api_key, base_url=base_url)
+        async with aiohttp.ClientSession(timeout=CLIENT_TIMEOUT) as session:
+            client = KnowledgeBaseClient(session, api_key=api_key, base_url=base_url)
 
-        dataset_id = fetch_dataset_id(client, dataset_name)
-        if not dataset_id:
-            click.echo(f"No dataset found with the name: {
-                       dataset_name}", err=True)
-            return
-        client.dataset_id = dataset_id
-
-        page = 1
-        while True:
-            response = client.list_documents(
-                page=page, page_size=100, keyword=keyword)
-            if response.status_code == 200:
-                documents = response.json().get('data', [])
-                if documents:
-                    for doc in documents:
-                        click.echo(f"id: {doc.get('id')}, name: {
-                                   doc.get('name')}")
-                        # click.echo(json.dumps(doc, indent=2, ensure_ascii=False))
-            else:
-                click.echo(f"Failed to retrieve documents. Status code: {
-                           response.status_code}", err=True)
+            dataset_id = await fetch_dataset_id(client, dataset_name)
+            if not dataset_id:
+                click.echo(f"No dataset found with the name: {
+                           dataset_name}", err=True)
                 return
+            client.dataset_id = dataset_id
 
-            if not response.json().get("has_more", False):
-                break
+            async def print_documents():
+                async for doc in iter_documents(client, keyword):
+                    click.echo(f"id: {doc.get('id')}, name: {
+                               doc.get('name')}")
+                    # click.echo(json.dumps(doc, indent=2, ensure_ascii=False))
 
+            try:
+                await print_documents()
+            except DatasetNotFoundError:
+                # The cached ID may belong to a dataset that was deleted and recreated; look it up again
+                client.dataset_id = await fetch_dataset_id(client, dataset_name, refresh=True)
+                if not client.dataset_id or client.dataset_id == dataset_id:
+                    raise
+                await print_documents()
+
+    try:
+        asyncio.run(run())
     except Exception as e:
         click.echo(f"An error occurred: {e}", err=True)
 